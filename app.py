@@ -1,15 +1,21 @@
 # C:/Projects/careerqr/app.py
 import streamlit as st
 import os
-import tempfile
 import requests
 import socket
-import qrcode
 import io
+import hashlib
+import logging
 import re  # Import the regular expression module
 
-# Your existing custom modules
-from qr_scanner import scan_qr
+# Configure logging once for the whole app (important for debugging in Azure logs)
+logging.basicConfig(
+    level=logging.INFO,
+    format="%(asctime)s [%(levelname)s] %(name)s: %(message)s",
+)
+logger = logging.getLogger(__name__)
+
+# Your existing custom modules (qr_scanner is imported by prepare_qr_scanner, since OpenCV is slow to load)
 from azure_resume_parser import extract_resume_data_full
 from azure_ai_advisor import get_career_advice
 # The import from azure_speaker is already correct
@@ -22,6 +28,21 @@ APP_TITLE = "📄 CareerQR – Scan Your Future"
 APP_SUBHEADER = "Upload a QR code with a resume link, or upload a resume PDF directly to get AI-powered career advice."
 QR_FILE_TYPES = ["png", "jpg", "jpeg"]
 RESUME_FILE_TYPES = ["pdf"]
+DOWNLOAD_CHUNK_SIZE = 65536
+
+# Bounds for the st.cache_data caches, which are shared by every session in the process
+CACHE_TTL_SECONDS = 60 * 60
+ANALYSIS_CACHE_MAX_ENTRIES = 64  # Extracted resume data / advice text, a few KB each
+QR_CACHE_MAX_ENTRIES = 256  # Decoded QR strings, tiny
+AUDIO_CACHE_MAX_ENTRIES = 8  # Each entry is a full WAV of the advice (10+ MB)
+
+# Precompiled patterns used by clean_text_for_speech.
+# Bold and italic stay separate passes, in this order, so nested and ***bold-italic***
+# markup is stripped exactly as it was with the inline re.sub calls.
+_RE_HEADING = re.compile(r'#{1,6} ')  # Headings like #, ##
+_RE_BOLD = re.compile(r'(\*\*|__)(.*?)(\*\*|__)')  # **Bold** or __Bold__
+_RE_ITALIC = re.compile(r'(\*|_)(.*?)(\*|_)')  # *Italic* or _Italic_
+_RE_WS = re.compile(r'\s+')
 
 
 # --- Helper Functions ---
@@ -31,15 +52,15 @@ def clean_text_for_speech(text: str) -> str:
     Removes Markdown and other non-verbal characters from text to improve speech synthesis.
     """
     # Remove Markdown headings, bold, italics, etc.
-    text = re.sub(r'#{1,6} ', '', text)  # Headings like #, ##
-    text = re.sub(r'(\*\*|__)(.*?)(\*\*|__)', r'\2', text)  # **Bold** or __Bold__
-    text = re.sub(r'(\*|_)(.*?)(\*|_)', r'\2', text)  # *Italic* or _Italic_
+    text = _RE_HEADING.sub('', text)
+    text = _RE_BOLD.sub(r'\2', text)
+    text = _RE_ITALIC.sub(r'\2', text)
 
     # Remove table formatting characters and code backticks
     text = text.replace('|', ' ').replace('---', ' ').replace('`', '')
 
     # Collapse multiple newlines and spaces into a single space
-    text = re.sub(r'\s+', ' ', text).strip()
+    text = _RE_WS.sub(' ', text).strip()
     return text
 
 
@@ -74,6 +95,8 @@ def display_network_qr_code():
     local_ip = get_local_ip()
 
     if local_ip != '127.0.0.1':
+        import qrcode  # Deferred: only needed when a network URL can be shown
+
         network_url = f"http://{local_ip}:{port}"
         st.sidebar.header("📱 Access on Your Phone")
         st.sidebar.info(
@@ -90,49 +113,117 @@ def display_network_qr_code():
             "Could not determine local network IP. To enable phone access, run with `--server.address=0.0.0.0`.")
 
 
-def analyze_resume(resume_path: str):
-    """Analyzes a resume file and stores results in session state."""
+class ResumeAnalysisError(Exception):
+    """Raised by the cached analysis steps so that failures are never cached."""
+
+
+@st.cache_data(show_spinner=False, max_entries=ANALYSIS_CACHE_MAX_ENTRIES, ttl=CACHE_TTL_SECONDS)
+def extract_resume_data_cached(resume_hash: str, _resume_bytes: bytes) -> dict:
+    """Extracts resume data once per distinct PDF, keyed on the SHA-256 of its bytes."""
+    resume_data = extract_resume_data_full(io.BytesIO(_resume_bytes))
+    if not resume_data:
+        raise ResumeAnalysisError("Could not extract data from resume. Please check the file or try another.")
+    return resume_data
+
+
+@st.cache_data(show_spinner=False, max_entries=ANALYSIS_CACHE_MAX_ENTRIES, ttl=CACHE_TTL_SECONDS)
+def get_career_advice_cached(resume_data: dict) -> str:
+    """Generates career advice once per distinct set of extracted resume data."""
+    advice = get_career_advice(resume_data)
+    if not advice or "error" in advice.lower():
+        raise ResumeAnalysisError("Could not generate career advice. Please try again.")
+    return advice
+
+
+@st.cache_resource(show_spinner=False)
+def get_http_session() -> requests.Session:
+    """
+    Returns one HTTP session per process, so repeated resume downloads reuse pooled
+    connections and TLS sessions across reruns and user sessions.
+    """
+    session = requests.Session()
+    session.mount("https://", requests.adapters.HTTPAdapter(pool_connections=10, pool_maxsize=20))
+    session.mount("http://", requests.adapters.HTTPAdapter(pool_connections=10, pool_maxsize=20))
+    return session
+
+
+@st.cache_resource(show_spinner=False)
+def prepare_qr_scanner():
+    """
+    Loads OpenCV and warms up the QR detector once per process, at the first page
+    load rather than during the first QR scan.
+    """
+    import cv2
+    import qr_scanner
+
+    # OpenCV threads internally by default, which is best for a single user. Set
+    # OPENCV_NUM_THREADS (e.g. to 1) when many concurrent sessions oversubscribe the CPU.
+    num_threads = os.getenv("OPENCV_NUM_THREADS")
+    if num_threads:
+        try:
+            cv2.setNumThreads(int(num_threads))
+        except ValueError:
+            logger.error(f"Ignoring invalid OPENCV_NUM_THREADS={num_threads!r}; expected an integer")
+
+    qr_scanner.warm_up()
+
+
+class QRScanError(Exception):
+    """Raised by the cached QR decode step so that failed scans are never cached."""
+
+
+@st.cache_data(show_spinner=False, max_entries=QR_CACHE_MAX_ENTRIES, ttl=CACHE_TTL_SECONDS)
+def scan_qr_bytes_cached(image_hash: str, _image_bytes: bytes) -> str:
+    """Decodes a QR image once per distinct upload, keyed on the SHA-256 of its bytes."""
+    from qr_scanner import scan_qr_bytes
+
+    qr_content = scan_qr_bytes(_image_bytes)
+    if not qr_content or qr_content.startswith("Error"):
+        raise QRScanError(qr_content)
+    return qr_content
+
+
+class SpeechSynthesisError(Exception):
+    """Raised by the cached speech step so that failed syntheses are never cached."""
+
+
+@st.cache_data(show_spinner=False, max_entries=AUDIO_CACHE_MAX_ENTRIES, ttl=CACHE_TTL_SECONDS)
+def get_speech_audio_data_cached(clean_text: str, voice: str = "jenny", rate: str = "medium") -> bytes:
+    """Synthesizes speech once per distinct (text, voice, rate) combination."""
+    audio_data = get_speech_audio_data(clean_text, voice, rate)
+    if not audio_data:
+        raise SpeechSynthesisError("Speech synthesis returned no audio.")
+    return audio_data
+
+
+def analyze_resume(resume_bytes: bytes):
+    """Analyzes a resume PDF's bytes and stores results in session state."""
     try:
+        resume_hash = hashlib.sha256(resume_bytes).hexdigest()
+
         with st.spinner("⏳ Analyzing your resume with Azure Form Recognizer..."):
-            resume_data = extract_resume_data_full(resume_path)
-            if not resume_data:
-                st.error("Could not extract data from resume. Please check the file or try another.")
-                return
+            resume_data = extract_resume_data_cached(resume_hash, resume_bytes)
 
         st.session_state.resume_data = resume_data
 
         with st.spinner("🧠 Generating career advice with Azure OpenAI..."):
-            advice = get_career_advice(resume_data)
-            if not advice or "error" in advice.lower():
-                st.error("Could not generate career advice. Please try again.")
-                return
+            advice = get_career_advice_cached(resume_data)
 
         st.session_state.advice = advice
+    except ResumeAnalysisError as e:
+        st.error(str(e))
     except Exception as e:
         st.error(f"An error occurred during analysis: {str(e)}")
 
 
-def handle_file_upload(uploaded_file, handler_func):
-    """Generic handler for file uploads to avoid code repetition."""
-    # This approach ensures the temporary file is always cleaned up, even if analysis fails.
-    file_path = None
-    try:
-        with tempfile.NamedTemporaryFile(delete=False, suffix=os.path.splitext(uploaded_file.name)[1]) as tmp_file:
-            file_path = tmp_file.name
-            tmp_file.write(uploaded_file.getvalue())
-
-        handler_func(file_path)
-    finally:
-        if file_path and os.path.exists(file_path):
-            os.unlink(file_path)
-
-
 def handle_qr_code_upload(qr_file):
     """Processes an uploaded QR code image."""
 
-    def process_qr(image_path):
-        qr_content = scan_qr(image_path)
-        if not qr_content or "error" in qr_content.lower():
+    def process_qr(image_bytes):
+        image_hash = hashlib.sha256(image_bytes).hexdigest()
+        try:
+            qr_content = scan_qr_bytes_cached(image_hash, image_bytes)
+        except QRScanError:
             st.error("Could not decode QR code. Please try another image.")
             return
 
@@ -140,34 +231,30 @@ def handle_qr_code_upload(qr_file):
 
         if qr_content.startswith(('http://', 'https://')):
             with st.spinner("Downloading resume from URL..."):
-                pdf_path = None
                 try:
-                    response = requests.get(qr_content, stream=True, timeout=10)
-                    response.raise_for_status()
+                    # The context manager returns the connection to the session's pool even on errors
+                    with get_http_session().get(qr_content, stream=True, timeout=10) as response:
+                        response.raise_for_status()
 
-                    # Create a temporary file for the downloaded PDF
-                    with tempfile.NamedTemporaryFile(delete=False, suffix='.pdf') as tmp_pdf:
-                        pdf_path = tmp_pdf.name
-                        for chunk in response.iter_content(chunk_size=8192):
-                            tmp_pdf.write(chunk)
+                        # Keep the downloaded PDF in memory and hand it straight to the parser
+                        pdf_buffer = io.BytesIO()
+                        for chunk in response.iter_content(chunk_size=DOWNLOAD_CHUNK_SIZE):
+                            pdf_buffer.write(chunk)
 
-                    analyze_resume(pdf_path)
+                    analyze_resume(pdf_buffer.getvalue())
 
                 except requests.exceptions.RequestException as e:
                     st.error(f"Failed to download file from URL: {str(e)}")
-                finally:
-                    # Ensure the downloaded file is always cleaned up
-                    if pdf_path and os.path.exists(pdf_path):
-                        os.unlink(pdf_path)
         else:
             st.warning("The QR code did not contain a valid URL. Please upload a resume PDF directly.")
 
-    handle_file_upload(qr_file, process_qr)
+    # Decode straight from the uploaded bytes; no temporary file is needed
+    process_qr(qr_file.getvalue())
 
 
 def handle_resume_upload(resume_file):
     """Processes a directly uploaded resume PDF."""
-    handle_file_upload(resume_file, analyze_resume)
+    analyze_resume(resume_file.getvalue())
 
 
 # --- Streamlit App UI ---
@@ -194,6 +281,7 @@ def main():
     st.set_page_config(page_title=PAGE_TITLE, page_icon=PAGE_ICON, layout="wide")
 
     display_network_qr_code()
+    prepare_qr_scanner()
     st.title(APP_TITLE)
     st.markdown(APP_SUBHEADER)
 
@@ -215,8 +303,11 @@ def main():
                     advice_text = st.session_state.advice
                     clean_advice = clean_text_for_speech(advice_text)
 
-                    # 2. Get the audio data from Azure using the cleaned text
-                    audio_data = get_speech_audio_data(clean_advice)
+                    # 2. Get the audio data from Azure using the cleaned text (cached across reruns)
+                    try:
+                        audio_data = get_speech_audio_data_cached(clean_advice)
+                    except SpeechSynthesisError:
+                        audio_data = None
 
                     # 3. If successful, display the audio player
                     if audio_data:
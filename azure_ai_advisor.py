@@ -1,23 +1,26 @@
 import os
 import logging
-from openai import AzureOpenAI
+from functools import lru_cache
 from dotenv import load_dotenv
-from typing import Optional, Dict, Any
+from typing import TYPE_CHECKING, Optional, Dict, Any
+
+if TYPE_CHECKING:
+    from openai import AzureOpenAI
 
 load_dotenv()
 
-# Configure logging
-logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-def initialize_client() -> Optional[AzureOpenAI]:
-    """Initialize Azure OpenAI client with error handling"""
+@lru_cache(maxsize=1)
+def get_client() -> Optional["AzureOpenAI"]:
+    """Return the shared Azure OpenAI client, creating it (and importing openai) on first use"""
     try:
         required_vars = ["AZURE_OPENAI_KEY", "AZURE_OPENAI_ENDPOINT", "AZURE_OPENAI_DEPLOYMENT"]
         missing_vars = [var for var in required_vars if not os.getenv(var)]
         if missing_vars:
             logger.error(f"Missing environment variables: {missing_vars}")
             return None
+        from openai import AzureOpenAI
         client = AzureOpenAI(
             api_key=os.getenv("AZURE_OPENAI_KEY"),
             api_version="2024-02-01",  # Updated to newer version
@@ -28,11 +31,11 @@ def initialize_client() -> Optional[AzureOpenAI]:
         logger.error(f"Failed to initialize Azure OpenAI client: {e}")
         return None
 
-client = initialize_client()
 DEPLOYMENT_NAME = os.getenv("AZURE_OPENAI_DEPLOYMENT")
 
 def get_career_advice(resume_data: Dict[Any, Any]) -> str:
     """Generate in-depth, scored career analysis with improvement suggestions"""
+    client = get_client()
     if not client:
         return "❌ Azure OpenAI service is not available. Please check your configuration."
     if not resume_data:
@@ -1,10 +1,15 @@
 import os
 import re
-from azure.ai.formrecognizer import DocumentAnalysisClient
-from azure.ai.textanalytics import TextAnalyticsClient
-from azure.core.credentials import AzureKeyCredential
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+from typing import TYPE_CHECKING, BinaryIO, Optional, Union
 from dotenv import load_dotenv
 
+if TYPE_CHECKING:
+    from azure.ai.formrecognizer import DocumentAnalysisClient
+    from azure.ai.textanalytics import TextAnalyticsClient
+
 load_dotenv()
 
 AZURE_FORM_KEY = os.getenv("AZURE_FORM_KEY")
@@ -12,33 +17,110 @@ AZURE_FORM_ENDPOINT = os.getenv("AZURE_FORM_ENDPOINT")
 AZURE_TEXT_KEY = os.getenv("AZURE_TEXT_KEY")
 AZURE_TEXT_ENDPOINT = os.getenv("AZURE_TEXT_ENDPOINT")
 
+logger = logging.getLogger(__name__)
+
+# The Azure SDKs are imported on first use so importing this module stays cheap.
+# Each client is created once and reused, sharing its credential and HTTP connection pool.
+@lru_cache(maxsize=1)
+def get_form_client() -> Optional["DocumentAnalysisClient"]:
+    """Return the shared Form Recognizer client, or None if it cannot be created"""
+    try:
+        if not AZURE_FORM_KEY or not AZURE_FORM_ENDPOINT:
+            logger.error("Missing environment variables: AZURE_FORM_KEY, AZURE_FORM_ENDPOINT")
+            return None
+        from azure.ai.formrecognizer import DocumentAnalysisClient
+        from azure.core.credentials import AzureKeyCredential
+        return DocumentAnalysisClient(
+            endpoint=AZURE_FORM_ENDPOINT,
+            credential=AzureKeyCredential(AZURE_FORM_KEY)
+        )
+    except Exception as e:
+        logger.error(f"Failed to initialize Form Recognizer client: {e}")
+        return None
+
+@lru_cache(maxsize=1)
+def get_text_client() -> Optional["TextAnalyticsClient"]:
+    """Return the shared Text Analytics client, or None if it cannot be created"""
+    try:
+        if not AZURE_TEXT_KEY or not AZURE_TEXT_ENDPOINT:
+            logger.error("Missing environment variables: AZURE_TEXT_KEY, AZURE_TEXT_ENDPOINT")
+            return None
+        from azure.ai.textanalytics import TextAnalyticsClient
+        from azure.core.credentials import AzureKeyCredential
+        return TextAnalyticsClient(
+            endpoint=AZURE_TEXT_ENDPOINT,
+            credential=AzureKeyCredential(AZURE_TEXT_KEY)
+        )
+    except Exception as e:
+        logger.error(f"Failed to initialize Text Analytics client: {e}")
+        return None
+
+_EMAIL_RE = re.compile(r'\b[A-Za-z0-9._%+-]+@[A-Za-z0-9.-]+\.[A-Za-z]{2,}\b')
+_PHONE_RE = re.compile(r'\+?\d[\d\s\-()]{7,}\d')
+
+# Section keywords; each group name is the key of the bucket it fills in the parsed data
+_CATEGORY_RE = re.compile(
+    r'(?P<skills>skill|technologies|tools)'
+    r'|(?P<projects>project|developed|built|designed)'
+    r'|(?P<education>education|bachelor|master|degree|university|college)'
+    r'|(?P<experience>experience|worked|internship|employment|job)'
+    r'|(?P<certifications>certification|certificate)',
+    re.IGNORECASE
+)
+
+# Names appear at the top of a resume, so NER only needs the beginning of the text.
+# NER is used instead of guessing from the first line's shape, since headings such as
+# "Software Engineer" or "Contact Information" look just like a name.
+NER_MAX_CHARS = 2048
+
 # Utility functions for email and phone extraction
 def extract_email(text):
-    match = re.search(r'\b[A-Za-z0-9._%+-]+@[A-Za-z0-9.-]+\.[A-Z|a-z]{2,}\b', text)
+    match = _EMAIL_RE.search(text)
     return match.group() if match else None
 
 def extract_phone(text):
-    match = re.search(r'\+?\d[\d\s\-()]{7,}\d', text)
+    match = _PHONE_RE.search(text)
     return match.group() if match else None
 
-def extract_resume_data_full(pdf_path: str) -> dict:
-    # Clients
-    form_client = DocumentAnalysisClient(
-        endpoint=AZURE_FORM_ENDPOINT,
-        credential=AzureKeyCredential(AZURE_FORM_KEY)
-    )
-    text_client = TextAnalyticsClient(
-        endpoint=AZURE_TEXT_ENDPOINT,
-        credential=AzureKeyCredential(AZURE_TEXT_KEY)
-    )
-
-    with open(pdf_path, "rb") as f:
-        poller = form_client.begin_analyze_document("prebuilt-document", document=f)
+def recognize_person_name(text_client, text):
+    """Return the first Person entity Azure Text Analytics finds in the text, or None."""
+    response = text_client.recognize_entities([text])
+    for doc in response:
+        if not doc.is_error:
+            for entity in doc.entities:
+                if entity.category == "Person":
+                    return entity.text
+    return None
+
+def classify_paragraphs(paragraphs, data):
+    """Append each paragraph's text to the section buckets in data that it mentions."""
+    for para in paragraphs:
+        content = para.content.strip()
+
+        # A paragraph can mention several sections, so collect every matching category
+        categories = {m.lastgroup for m in _CATEGORY_RE.finditer(content)}
+        for category in categories:
+            data[category].append(content)
+
+        # Others: reuse the categories found above instead of scanning again
+        if not categories:
+            data["others"].append(content)
+
+def extract_resume_data_full(pdf_source: Union[str, BinaryIO]) -> dict:
+    """Parse a resume given either a file path or an open binary stream (e.g. io.BytesIO)."""
+    form_client = get_form_client()
+    if not form_client:
+        logger.error("Azure Form Recognizer service is not available. Please check your configuration.")
+        return {}
+
+    if isinstance(pdf_source, (str, os.PathLike)):
+        with open(pdf_source, "rb") as f:
+            poller = form_client.begin_analyze_document("prebuilt-document", document=f)
+    else:
+        # Streams are sent as-is, avoiding a round-trip through a temporary file
+        poller = form_client.begin_analyze_document("prebuilt-document", document=pdf_source)
     result = poller.result()
 
-    # Full text for regex and NER
-    full_text = " ".join([p.content for p in result.paragraphs])
-
     # Initial data structure
     data = {
         "name": None,
@@ -61,58 +143,37 @@ def extract_resume_data_full(pdf_path: str) -> dict:
             elif "email" in key and not data["email"]: data["email"] = val
             elif "phone" in key and not data["phone"]: data["phone"] = val
 
+    # Full text for regex and NER, only built when one of those fallbacks is needed
+    full_text = ""
+    if not (data["email"] and data["phone"] and data["name"]):
+        full_text = " ".join([p.content for p in result.paragraphs])
+
     # Backup: Regex for email and phone
     if not data["email"]:
         data["email"] = extract_email(full_text)
     if not data["phone"]:
         data["phone"] = extract_phone(full_text)
 
-    # NER for Name if still missing
-    if not data["name"]:
-        response = text_client.recognize_entities([full_text])
-        for doc in response:
-            if not doc.is_error:
-                for entity in doc.entities:
-                    if entity.category == "Person":
-                        data["name"] = entity.text
-                        break
-
-    # Paragraph Scanning for Skills, Projects, etc.
-    for para in result.paragraphs:
-        content = para.content.lower()
-
-        # Skills detection
-        if any(word in content for word in ["skill", "technologies", "tools"]):
-            data["skills"].append(para.content)
-
-        # Project detection
-        if any(word in content for word in ["project", "developed", "built", "designed"]):
-            data["projects"].append(para.content)
-
-        # Education detection
-        if any(word in content for word in ["education", "bachelor", "master", "degree", "university", "college"]):
-            data["education"].append(para.content)
-
-        # Experience detection
-        if any(word in content for word in ["experience", "worked", "internship", "employment", "job"]):
-            data["experience"].append(para.content)
-
-        # Certifications detection
-        if "certification" in content or "certificate" in content:
-            data["certifications"].append(para.content)
-
-        # Others
-        if not any(word in content for word in ["skill", "project", "education", "experience", "certification"]):
-            data["others"].append(para.content)
-
-    # Optional: Clean duplicates, strip text
+    # NER for Name if still missing. The request runs in the background while the
+    # paragraphs are classified, since the two don't depend on each other.
+    text_client = get_text_client() if not data["name"] else None
+    if text_client:
+        with ThreadPoolExecutor(max_workers=1) as executor:
+            ner_future = executor.submit(recognize_person_name, text_client, full_text[:NER_MAX_CHARS])
+            classify_paragraphs(result.paragraphs, data)
+            data["name"] = ner_future.result()
+    else:
+        classify_paragraphs(result.paragraphs, data)
+
+    # Clean duplicates (text was already stripped on insertion), keeping document order
     for key in ["skills", "projects", "education", "experience", "certifications", "others"]:
-        data[key] = list(set([x.strip() for x in data[key]]))
+        data[key] = list(dict.fromkeys(data[key]))
 
     return data
 
 
 # Example usage:
-pdf_path = "C:\Projects\careerqr\sample_resume.pdf"
-resume_info = extract_resume_data_full(pdf_path)
-print(resume_info)
+if __name__ == "__main__":
+    pdf_path = "sample_resume.pdf"
+    resume_info = extract_resume_data_full(pdf_path)
+    print(resume_info)
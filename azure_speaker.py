@@ -2,13 +2,13 @@ import os
 import logging
 import asyncio
 import html  # Import the html module for escaping special characters
+import threading
+from contextlib import contextmanager
 from typing import Optional, Dict, Any, Union
 from enum import Enum
 import azure.cognitiveservices.speech as speechsdk
 from dotenv import load_dotenv
 
-# Configure logging
-logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
 load_dotenv()
@@ -36,10 +36,20 @@ class SpeechRate(Enum):
 
 
 class AzureSpeechService:
+    # SSML skeleton; only the voice, rate and escaped text change between requests.
+    # Kept on one line so no indentation whitespace is sent to (and parsed by) the service.
+    _SSML_TEMPLATE = (
+        '<speak version="1.0" xmlns="http://www.w3.org/2001/10/synthesis" xml:lang="en-US">'
+        '<voice name="%s"><prosody rate="%s">%s</prosody></voice></speak>'
+    )
+
     def __init__(self):
         self.speech_key = os.getenv("AZURE_SPEECH_KEY")
         self.speech_region = os.getenv("AZURE_SPEECH_REGION")
         self.speech_config = None
+        # Idle in-memory synthesizers; a synthesizer serves one request at a time
+        self._synthesizer_pool = []
+        self._synthesizer_pool_lock = threading.Lock()
         self._initialize_config()
 
     def _initialize_config(self) -> None:
@@ -55,23 +65,41 @@ class AzureSpeechService:
             )
             # Set a default voice
             self.speech_config.speech_synthesis_voice_name = VoiceType.JENNY.value
+            # Pre-create one in-memory synthesizer so the first request finds a warm one
+            self._synthesizer_pool.append(self._create_memory_synthesizer())
             logger.info("Azure Speech Service initialized successfully")
         except Exception as e:
             logger.error(f"Failed to initialize Azure Speech Service: {e}")
 
+    def _create_memory_synthesizer(self) -> speechsdk.SpeechSynthesizer:
+        """Create a synthesizer that returns audio data instead of playing it (audio_config=None)."""
+        return speechsdk.SpeechSynthesizer(speech_config=self.speech_config, audio_config=None)
+
+    @contextmanager
+    def _borrow_memory_synthesizer(self):
+        """
+        Lend an idle in-memory synthesizer from the pool, creating one if none is free.
+
+        Synthesizers are reused so their audio pipeline and connection are set up once,
+        but each one handles a single request at a time, so concurrent sessions each
+        get their own. The pool grows only to the peak number of parallel requests.
+        """
+        with self._synthesizer_pool_lock:
+            synthesizer = self._synthesizer_pool.pop() if self._synthesizer_pool else None
+        if synthesizer is None:
+            synthesizer = self._create_memory_synthesizer()
+        try:
+            yield synthesizer
+        finally:
+            with self._synthesizer_pool_lock:
+                self._synthesizer_pool.append(synthesizer)
+
     def _create_ssml(self, text: str, voice: VoiceType, rate: SpeechRate) -> str:
         """Create SSML (Speech Synthesis Markup Language) for better control."""
-        # Escape special XML characters in the text to prevent synthesis errors
-        escaped_text = html.escape(text)
-        return f"""
-        <speak version="1.0" xmlns="http://www.w3.org/2001/10/synthesis" xml:lang="en-US">
-            <voice name="{voice.value}">
-                <prosody rate="{rate.value}">
-                    {escaped_text}
-                </prosody>
-            </voice>
-        </speak>
-        """
+        # Escape special XML characters in the text to prevent synthesis errors.
+        # Quotes only need escaping inside attributes, and the text is element content.
+        escaped_text = html.escape(text, quote=False)
+        return self._SSML_TEMPLATE % (voice.value, rate.value, escaped_text)
 
     def speak_text(self, text: str, voice: VoiceType = VoiceType.JENNY,
                    rate: SpeechRate = SpeechRate.MEDIUM,
@@ -138,9 +166,9 @@ class AzureSpeechService:
 
         try:
             ssml_text = self._create_ssml(text, voice, rate)
-            # Synthesize to an in-memory stream by setting audio_config to None
-            synthesizer = speechsdk.SpeechSynthesizer(speech_config=self.speech_config, audio_config=None)
-            result = synthesizer.speak_ssml_async(ssml_text).get()
+            # Synthesize to an in-memory stream on a synthesizer no other request is using
+            with self._borrow_memory_synthesizer() as synthesizer:
+                result = synthesizer.speak_ssml_async(ssml_text).get()
 
             if result.reason == speechsdk.ResultReason.SynthesizingAudioCompleted:
                 logger.info("Speech synthesis to memory completed successfully.")
@@ -171,6 +199,9 @@ RATE_MAPPING = {
     "x-slow": SpeechRate.X_SLOW, "x-fast": SpeechRate.X_FAST
 }
 
+# Texts shorter than this (after stripping) aren't worth an Azure round-trip
+MIN_SPEECH_CHARS = 3
+
 
 def get_speech_audio_data(text: str, voice: str = "jenny", rate: str = "medium") -> Optional[bytes]:
     """
@@ -185,6 +216,9 @@ def get_speech_audio_data(text: str, voice: str = "jenny", rate: str = "medium")
     Returns:
         Audio data in bytes, or None on failure.
     """
+    if not text or len(text.strip()) < MIN_SPEECH_CHARS:
+        logger.warning("Text too short for speech synthesis, skipping request")
+        return None
     try:
         selected_voice = VOICE_MAPPING.get(voice.lower(), VoiceType.JENNY)
         selected_rate = RATE_MAPPING.get(rate.lower(), SpeechRate.MEDIUM)
@@ -6,81 +6,268 @@ This module provides QR code scanning functionality using OpenCV's QRCodeDetecto
 It was rewritten to avoid the pyzbar/zbar dependency, which causes ImportError on
 Azure App Services (since libzbar is not available there).
 
+When OpenCV is built with the contrib modules (opencv-contrib-python-headless),
+the more robust WeChat QR detector is used instead. Set WECHAT_QRCODE_MODEL_DIR
+to a directory containing detect.prototxt, detect.caffemodel, sr.prototxt and
+sr.caffemodel to enable its CNN detector and super-resolution models.
+
 Functions
 ---------
-- load_image(path): Safely loads an image file.
-- preprocess_image(img): Prepares an image for QR detection (optional grayscale).
+- load_image(path, color=False): Safely loads an image file (grayscale by default).
+- preprocess_image(img): Prepares an image for QR detection (downscales large inputs).
 - scan_qr(image_path): Detects and decodes QR codes from an image file.
 - scan_qr_bytes(image_bytes): Alternative QR decoding directly from bytes.
+- scan_qr_batch(image_paths): Scans several image files concurrently.
+- borrow_detector(): Context manager lending a pooled, reusable QR detector.
+- jpeg_dimensions(image_bytes): Reads JPEG width/height from the header only.
+- warm_up(): Primes OpenCV and the detector pool; call once at app start-up.
 """
 
 import cv2
 import numpy as np
 import os
 import logging
-
-# Configure logging (important for debugging in Azure logs)
-logging.basicConfig(
-    level=logging.INFO,
-    format="%(asctime)s [%(levelname)s] %(message)s",
+import struct
+import threading
+from contextlib import contextmanager
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+
+# Logging is configured by the application (see app.py); this module only emits records
+logger = logging.getLogger(__name__)
+
+# Longest image edge (pixels) used for the first detection attempt
+MAX_DETECTION_DIM = 1024
+
+# imdecode flags that let libjpeg downscale by 2/4/8 during decode, largest factor first
+_REDUCED_GRAYSCALE_FLAGS = (
+    (8, cv2.IMREAD_REDUCED_GRAYSCALE_8),
+    (4, cv2.IMREAD_REDUCED_GRAYSCALE_4),
+    (2, cv2.IMREAD_REDUCED_GRAYSCALE_2),
 )
 
+# Optional model files for cv2.wechat_qrcode_WeChatQRCode (opencv-contrib only)
+WECHAT_MODEL_DIR = os.getenv("WECHAT_QRCODE_MODEL_DIR")
+_WECHAT_MODEL_FILES = ("detect.prototxt", "detect.caffemodel", "sr.prototxt", "sr.caffemodel")
+
+# Pool of idle detectors. Streamlit runs each script rerun on a new thread, so the
+# pool is process-wide: detectors survive across reruns and sessions, and each one
+# is lent to a single caller at a time because it keeps mutable internal state.
+_detector_pool = []
+_detector_pool_lock = threading.Lock()
+
 # -----------------------------
 # Utility Functions
 # -----------------------------
 
-def load_image(image_path: str):
+def _create_detector():
+    """
+    Creates the best available detector: WeChatQRCode if OpenCV has the contrib
+    module, otherwise the stock cv2.QRCodeDetector.
+    """
+    if hasattr(cv2, "wechat_qrcode_WeChatQRCode"):
+        try:
+            if WECHAT_MODEL_DIR:
+                model_paths = [os.path.join(WECHAT_MODEL_DIR, name) for name in _WECHAT_MODEL_FILES]
+                return cv2.wechat_qrcode_WeChatQRCode(*model_paths)
+            return cv2.wechat_qrcode_WeChatQRCode()
+        except cv2.error as e:
+            logger.warning("WeChat QR detector unavailable, using QRCodeDetector: %s", e)
+    return cv2.QRCodeDetector()
+
+
+@contextmanager
+def borrow_detector():
+    """
+    Lends a QR detector from the process-wide pool, creating one if none is idle.
+
+    The detector keeps mutable internal state, so it is used by one caller at
+    a time and returned to the pool afterwards; the pool grows only to the
+    peak number of concurrent scans.
+
+    Yields
+    ------
+    detector : cv2.QRCodeDetector or cv2.wechat_qrcode.WeChatQRCode
+        A detector for exclusive use within the `with` block.
+    """
+    with _detector_pool_lock:
+        detector = _detector_pool.pop() if _detector_pool else None
+    if detector is None:
+        detector = _create_detector()
+    try:
+        yield detector
+    finally:
+        with _detector_pool_lock:
+            _detector_pool.append(detector)
+
+
+def _run_detector(detector, img):
+    """
+    Runs either detector type and normalizes the result to (data, points).
+    """
+    if isinstance(detector, cv2.QRCodeDetector):
+        data, points, _ = detector.detectAndDecode(img)
+        return data, points
+    # WeChatQRCode returns every decoded string with its corner points
+    texts, points = detector.detectAndDecode(img)
+    if texts:
+        return texts[0], points[0]
+    return "", None
+
+
+def load_image(image_path: str, color: bool = False):
     """
     Safely loads an image from disk using OpenCV.
 
+    By default the image is decoded straight to a single-channel grayscale
+    buffer, which is all QR detection needs and avoids allocating a 3-channel
+    BGR image only to convert it afterwards.
+
     Parameters
     ----------
     image_path : str
         Path to the image file.
+    color : bool, optional
+        Load the image as BGR instead of grayscale (default False).
 
     Returns
     -------
     img : np.ndarray or None
         The loaded image as a NumPy array, or None if loading failed.
     """
-    if not os.path.exists(image_path):
-        logging.error(f"Image file does not exist: {image_path}")
+    if _stat_image_file(image_path) is None:
+        return None
+    return _read_image(image_path, color)
+
+
+def _stat_image_file(image_path: str):
+    """
+    Stats an image file once, covering both the existence and empty-file checks.
+
+    Returns
+    -------
+    os.stat_result or None
+        The file's stat result, or None (after logging) if it is missing or empty.
+    """
+    try:
+        stat = os.stat(image_path)
+    except OSError:
+        logger.error("Image file does not exist: %s", image_path)
+        return None
+    if stat.st_size == 0:
+        logger.error("Image file is empty: %s", image_path)
         return None
+    return stat
 
-    img = cv2.imread(image_path)
+
+def _read_image(image_path: str, color: bool = False):
+    """Decodes an image file that has already passed _stat_image_file."""
+    img = cv2.imread(image_path, cv2.IMREAD_COLOR if color else cv2.IMREAD_GRAYSCALE)
     if img is None:
-        logging.error(f"Failed to load image with OpenCV: {image_path}")
+        logger.error("Failed to load image with OpenCV: %s", image_path)
     else:
-        logging.info(f"Successfully loaded image: {image_path}")
+        logger.debug("Successfully loaded image: %s", image_path)
     return img
 
 
-def preprocess_image(img):
+def preprocess_image(img, max_dim: int = MAX_DETECTION_DIM):
     """
     Optionally preprocesses the image for better QR detection.
 
     Currently:
-    - Converts to grayscale if needed.
+    - Downscales images whose longest edge exceeds `max_dim`. Detection cost
+      grows with pixel count, and a QR code in a phone photo stays decodable
+      well below native resolution.
+    - No color conversion: images are decoded as grayscale by the loaders, and
+      QRCodeDetector converts any BGR input itself, so a cvtColor pass here
+      would only duplicate work.
 
     Parameters
     ----------
     img : np.ndarray
         Input image.
+    max_dim : int, optional
+        Maximum length of the longest edge after preprocessing.
 
     Returns
     -------
     processed_img : np.ndarray
-        Grayscale or original image.
+        Image ready for detection (the input itself if no resize was needed).
     """
     if img is None:
         return None
-    try:
-        gray = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
-        logging.debug("Image converted to grayscale for QR detection.")
-        return gray
-    except Exception as e:
-        logging.warning(f"Grayscale conversion failed, using original image: {e}")
-        return img
+    h, w = img.shape[:2]
+    scale = max_dim / max(h, w)
+    if scale < 1.0:
+        logger.debug("Downscaling %dx%d image by %.2f for QR detection.", w, h, scale)
+        return cv2.resize(img, None, fx=scale, fy=scale, interpolation=cv2.INTER_AREA)
+    return img
+
+
+def jpeg_dimensions(image_bytes: bytes):
+    """
+    Reads a JPEG's width and height from its SOF header without decoding pixels.
+
+    Parameters
+    ----------
+    image_bytes : bytes
+        Image file content in memory.
+
+    Returns
+    -------
+    (width, height) : tuple of int, or None
+        The dimensions, or None if the bytes are not a JPEG or no SOF marker was found.
+    """
+    if image_bytes[:2] != b"\xff\xd8":
+        return None
+    i, n = 2, len(image_bytes)
+    while i + 9 <= n:
+        if image_bytes[i] != 0xFF:
+            return None
+        marker = image_bytes[i + 1]
+        if marker == 0xFF:  # Fill byte before a marker
+            i += 1
+            continue
+        # SOF0-SOF15, excluding DHT (C4), JPG (C8) and DAC (CC)
+        if 0xC0 <= marker <= 0xCF and marker not in (0xC4, 0xC8, 0xCC):
+            height, width = struct.unpack(">HH", image_bytes[i + 5:i + 9])
+            return width, height
+        segment_length = struct.unpack(">H", image_bytes[i + 2:i + 4])[0]
+        i += 2 + segment_length
+    return None
+
+
+def _reduced_grayscale_flag(image_bytes: bytes, max_dim: int = MAX_DETECTION_DIM) -> int:
+    """
+    Picks the imdecode flag for the first detection attempt: the largest JPEG
+    decode-time reduction that still leaves the longest edge >= `max_dim`,
+    or plain IMREAD_GRAYSCALE when no reduction applies.
+    """
+    size = jpeg_dimensions(image_bytes)
+    if size:
+        longest = max(size)
+        for factor, flag in _REDUCED_GRAYSCALE_FLAGS:
+            if longest // factor >= max_dim:
+                return flag
+    return cv2.IMREAD_GRAYSCALE
+
+
+def _detect_and_decode(img):
+    """
+    Runs QR detection on the preprocessed image, retrying at full resolution
+    if a downscaled attempt finds nothing (e.g. a very small QR code).
+
+    Returns
+    -------
+    (data, points) : tuple
+        Decoded text and corner points as returned by detectAndDecode.
+    """
+    processed_img = preprocess_image(img)
+    with borrow_detector() as detector:
+        data, points = _run_detector(detector, processed_img)
+        if (points is None or not data) and processed_img is not img:
+            data, points = _run_detector(detector, img)
+    return data, points
 
 
 # -----------------------------
@@ -91,6 +278,9 @@ def scan_qr(image_path: str) -> str:
     """
     Detects and decodes a QR code from a file path.
 
+    Results are memoized per (path, modification time, size), so rescanning an
+    unchanged file returns immediately while an edited file is scanned again.
+
     Parameters
     ----------
     image_path : str
@@ -101,29 +291,38 @@ def scan_qr(image_path: str) -> str:
     str
         Decoded QR content, or an error message if detection fails.
     """
+    stat = _stat_image_file(image_path)
+    if stat is None:
+        return "Error: Could not read image file."
     try:
-        img = load_image(image_path)
-        if img is None:
-            return "Error: Could not read image file."
+        return _scan_qr_file_cached(image_path, stat.st_mtime_ns, stat.st_size)
+    except Exception as e:
+        # Raised outside the cache, so a transient failure is retried on the next scan
+        logger.exception("Exception during QR decoding.")
+        return f"Error while decoding QR: {str(e)}"
 
-        # Preprocess the image (grayscale conversion)
-        processed_img = preprocess_image(img)
 
-        # Initialize OpenCV's QRCodeDetector
-        detector = cv2.QRCodeDetector()
+@lru_cache(maxsize=256)
+def _scan_qr_file_cached(image_path: str, mtime_ns: int, size: int) -> str:
+    """
+    Cached implementation of scan_qr; mtime_ns and size only form part of the key.
 
-        # Detect and decode
-        data, points, _ = detector.detectAndDecode(processed_img)
+    Exceptions propagate to scan_qr, so lru_cache only stores results of
+    completed scans (decoded data, or an unreadable/empty-detection message).
+    """
+    img = _read_image(image_path)
+    if img is None:
+        return "Error: Could not read image file."
 
-        if points is not None and data:
-            logging.info(f"QR code detected and decoded: {data[:50]}...")  # limit log length
-            return data
-        else:
-            logging.warning("No QR code found in the image.")
-            return "Error: No QR code found in the image."
-    except Exception as e:
-        logging.exception("Exception during QR decoding.")
-        return f"Error while decoding QR: {str(e)}"
+    # Detect and decode (downscaled first, full resolution on a miss)
+    data, points = _detect_and_decode(img)
+
+    if points is not None and data:
+        logger.info("QR code detected and decoded: %.50s...", data)  # limit log length
+        return data
+    else:
+        logger.warning("No QR code found in the image.")
+        return "Error: No QR code found in the image."
 
 
 def scan_qr_bytes(image_bytes: bytes) -> str:
@@ -140,29 +339,86 @@ def scan_qr_bytes(image_bytes: bytes) -> str:
     str
         Decoded QR content, or an error message.
     """
+    if not image_bytes:
+        # imdecode raises on an empty buffer; reject it without the exception round-trip
+        logger.error("No image bytes provided.")
+        return "Error: Could not decode image bytes."
+
     try:
         # Convert bytes to NumPy array
         np_arr = np.frombuffer(image_bytes, np.uint8)
-        img = cv2.imdecode(np_arr, cv2.IMREAD_COLOR)
+        # Decode directly to grayscale; QR detection doesn't need color channels.
+        # Large JPEGs are also downscaled by libjpeg during decode, which is far
+        # cheaper than decoding at full size and resizing afterwards.
+        read_flag = _reduced_grayscale_flag(image_bytes)
+        img = cv2.imdecode(np_arr, read_flag)
 
         if img is None:
-            logging.error("Failed to decode image bytes.")
+            logger.error("Failed to decode image bytes.")
             return "Error: Could not decode image bytes."
 
-        processed_img = preprocess_image(img)
-        detector = cv2.QRCodeDetector()
-        data, points, _ = detector.detectAndDecode(processed_img)
+        if read_flag == cv2.IMREAD_GRAYSCALE:
+            data, points = _detect_and_decode(img)
+        else:
+            # The reduced decode is already near MAX_DETECTION_DIM, so detect on it as is;
+            # preprocess_image would only shrink it slightly and add a near-duplicate attempt.
+            # A very small QR code may not survive the reduction, so a miss retries once at
+            # full size: two detections at most.
+            with borrow_detector() as detector:
+                data, points = _run_detector(detector, img)
+                if points is None or not data:
+                    full_img = cv2.imdecode(np_arr, cv2.IMREAD_GRAYSCALE)
+                    if full_img is not None:
+                        data, points = _run_detector(detector, full_img)
 
         if points is not None and data:
-            logging.info(f"QR code decoded from bytes: {data[:50]}...")
+            logger.info("QR code decoded from bytes: %.50s...", data)
             return data
         else:
             return "Error: No QR code found in the provided bytes."
     except Exception as e:
-        logging.exception("Exception during QR decoding from bytes.")
+        logger.exception("Exception during QR decoding from bytes.")
         return f"Error while decoding QR from bytes: {str(e)}"
 
 
+def scan_qr_batch(image_paths, max_workers=None) -> list:
+    """
+    Scans several QR code images concurrently.
+
+    OpenCV releases the GIL while decoding and detecting, so a thread pool
+    scales with the number of cores. Each concurrent scan borrows its own
+    detector from the pool (see borrow_detector).
+
+    Parameters
+    ----------
+    image_paths : iterable of str
+        Paths to the QR code images.
+    max_workers : int, optional
+        Number of worker threads (defaults to os.cpu_count()).
+
+    Returns
+    -------
+    list of str
+        Results of scan_qr, in the same order as `image_paths`.
+    """
+    with ThreadPoolExecutor(max_workers=max_workers or os.cpu_count()) as executor:
+        return list(executor.map(scan_qr, image_paths))
+
+
+def warm_up() -> None:
+    """
+    Runs one detection on a blank image so OpenCV's lazy internal setup, and
+    the first pooled detector, are ready before the first real scan.
+
+    Call this at application start-up; it is not run on import.
+    """
+    try:
+        with borrow_detector() as detector:
+            _run_detector(detector, np.zeros((64, 64), np.uint8))
+    except Exception as e:
+        logger.debug("QR detector warm-up failed: %s", e)
+
+
 # -----------------------------
 # Test Harness
 # -----------------------------
@@ -172,6 +428,7 @@ if __name__ == "__main__":
     Basic test harness for local debugging.
     Run this file directly to test QR scanning functionality.
     """
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s [%(levelname)s] %(message)s")
     sample_path = "sample_qr.png"  # Change to your test QR image path
     if os.path.exists(sample_path):
         result = scan_qr(sample_path)